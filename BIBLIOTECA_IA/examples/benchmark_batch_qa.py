@@ -0,0 +1,76 @@
+"""
+Benchmark: respostas em lote (`answer_questions_batch`) vs. laço de uma pergunta por vez.
+
+Usa embeddings e cadeia falsos com latência simulada, para medir apenas o ganho de lotes de embedding,
+busca matricial e concorrência, sem depender de chaves de API.
+
+    python -m BIBLIOTECA_IA.examples.benchmark_batch_qa
+"""
+import random
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from BIBLIOTECA_IA.frameworks.langchain.tools_utils.text_utils import answer_questions_batch
+
+EMBED_LATENCY = 0.02  # segundos por chamada à API de embeddings
+LLM_LATENCY = 0.05  # segundos por chamada ao modelo
+DIMENSIONS = 256
+
+
+class SlowFakeEmbeddings(Embeddings):
+    def _vector(self, text):
+        rng = random.Random(text)
+        return [rng.random() for _ in range(DIMENSIONS)]
+
+    def embed_documents(self, texts):
+        time.sleep(EMBED_LATENCY)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(EMBED_LATENCY)
+        return self._vector(text)
+
+    def embed_queries(self, texts):
+        # Consultas e documentos têm a mesma representação, então o lote é equivalente a embed_query
+        return self.embed_documents(texts)
+
+
+class SlowFakeChain:
+    def invoke(self, inputs):
+        time.sleep(LLM_LATENCY)
+        return {"output_text": f"{len(inputs['input_documents'])} docs para: {inputs['question']}"}
+
+
+def per_question_loop(questions, vector_store, chain, k):
+    for question in questions:
+        docs = vector_store.similarity_search(question, k=k)
+        yield chain.invoke({"input_documents": docs, "question": question})["output_text"]
+
+
+def main(num_chunks=2000, num_questions=200, k=4, max_concurrency=8):
+    embeddings = SlowFakeEmbeddings()
+    chunks = [f"Trecho {i} do manual de teste." for i in range(num_chunks)]
+    vectors = [embeddings._vector(chunk) for chunk in chunks]
+    vector_store = FAISS.from_embeddings(list(zip(chunks, vectors)), embeddings)
+    questions = [f"Pergunta {i}?" for i in range(num_questions)]
+    chain = SlowFakeChain()
+
+    start = time.perf_counter()
+    list(per_question_loop(questions, vector_store, chain, k))
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = list(answer_questions_batch(questions, vector_store, chain, k=k, max_concurrency=max_concurrency))
+    batch_time = time.perf_counter() - start
+
+    errors = sum(result["error"] is not None for result in results)
+    print(f"Perguntas: {num_questions} | chunks: {num_chunks} | k: {k} | concorrência: {max_concurrency}")
+    print(f"Laço por pergunta: {loop_time:.2f}s ({num_questions / loop_time:.1f} perguntas/s)")
+    print(f"Lote:              {batch_time:.2f}s ({num_questions / batch_time:.1f} perguntas/s), erros: {errors}")
+    print(f"Ganho: {loop_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Verificação da deduplicação com revisões sucessivas de um mesmo texto.
+
+Cada revisão altera algumas palavras da anterior (similaridade ~0.9 entre revisões consecutivas), de modo que
+revisões distantes já não são duplicadas entre si. Verifica que todo chunk descartado por `deduplicate_chunks`
+atinge o limiar com o chunk mantido em seu lugar, e não apenas com outro chunk descartado.
+
+    python -m BIBLIOTECA_IA.examples.dedup_revisions
+"""
+import random
+
+from BIBLIOTECA_IA.frameworks.langchain.tools_utils.dedup_utils import deduplicate_chunks, minhash_signatures
+
+
+def generate_revisions(num_revisions=8, num_words=400, changes_per_revision=4, seed=0):
+    """
+    Gera `num_revisions` versões de um texto, cada uma com `changes_per_revision` palavras trocadas em relação à anterior.
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"palavra{i}" for i in range(5000)]
+    words = [rng.choice(vocabulary) for _ in range(num_words)]
+    revisions = [" ".join(words)]
+    for _ in range(num_revisions - 1):
+        words = list(words)
+        for position in rng.sample(range(num_words), changes_per_revision):
+            words[position] = rng.choice(vocabulary)
+        revisions.append(" ".join(words))
+    return revisions
+
+
+def main(threshold=0.85, num_perm=128, shingle_size=5):
+    results = []
+    for keep in ("first", "longest"):
+        chunks = generate_revisions()
+        kept, metadatas, report = deduplicate_chunks(chunks, threshold=threshold, num_perm=num_perm,
+                                                     shingle_size=shingle_size, keep=keep)
+        signatures = minhash_signatures(chunks, num_perm=num_perm, shingle_size=shingle_size)
+
+        print(f'keep="{keep}": mantidas {[metadata["chunk_index"] for metadata in metadatas]} '
+              f'de {report["total_chunks"]} revisões')
+        lowest = 1.0
+        for metadata in metadatas:
+            for duplicate in metadata["duplicate_indices"]:
+                similarity = (signatures[metadata["chunk_index"]] == signatures[duplicate]).mean()
+                lowest = min(lowest, similarity)
+                print(f"  revisão {duplicate} descartada no lugar da {metadata['chunk_index']} "
+                      f"(Jaccard estimado {similarity:.2f})")
+        ok = lowest >= threshold
+        print(f"[{'ok' if ok else 'FALHOU'}] todo chunk descartado tem similaridade >= {threshold} com o chunk mantido")
+        results.append(ok)
+    return all(results)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
@@ -0,0 +1,130 @@
+"""
+Teste do `RouterChatModel` contra servidores locais que imitam a API de chat da OpenAI, com latência e
+erros injetados. Não precisa de chaves de API nem de rede.
+
+    python -m BIBLIOTECA_IA.examples.router_stub_servers
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_openai import ChatOpenAI
+
+from BIBLIOTECA_IA.models.router import RouterChatModel
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # O backlog padrão (5) faz as conexões excedentes de um pico esperarem o reenvio do SYN (1s)
+    request_queue_size = 128
+
+
+class StubServer:
+    """
+    Servidor local compatível com POST /v1/chat/completions. `latency` (segundos) e `fail` (responde 429)
+    podem ser alterados a qualquer momento para simular picos de latência e instabilidade do provedor.
+    """
+
+    def __init__(self, name, latency=0.0, fail=False):
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.calls += 1
+                time.sleep(stub.latency)
+                if stub.fail:
+                    body = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+                    status = 429
+                else:
+                    body = {
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": stub.name,
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": stub.name}}],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                    }
+                    status = 200
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        self.server = _StubHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def model(self):
+        return ChatOpenAI(model=self.name, base_url=self.base_url, api_key="stub", max_retries=0, timeout=10)
+
+
+def check(description, condition):
+    print(f"[{'ok' if condition else 'FALHOU'}] {description}")
+    return condition
+
+
+def main():
+    fast = StubServer("fast", latency=0.05)
+    slow = StubServer("slow", latency=0.6)
+    local = StubServer("local", latency=0.01)
+    results = []
+
+    # Hedging: o alvo lento é o primeiro, mas a resposta vem do rápido após hedge_delay
+    router = RouterChatModel(targets=[slow.model(), fast.model()], fallbacks=[local.model()], hedge_delay=0.1)
+    start = time.perf_counter()
+    answer = router.invoke("oi").content
+    results.append(check(f"hedge responde pelo alvo rápido ({answer}, {time.perf_counter() - start:.2f}s)",
+                         answer == "fast" and time.perf_counter() - start < 0.5))
+
+    # Roteamento pela latência: com medições, as requisições vão direto ao alvo mais rápido
+    time.sleep(0.7)
+    slow.calls = 0
+    answers = [router.invoke("oi").content for _ in range(5)]
+    results.append(check("requisições seguintes vão ao alvo mais rápido", answers == ["fast"] * 5 and slow.calls == 0))
+
+    # Falha passageira não rebaixa o alvo para sempre
+    flaky = StubServer("flaky", latency=0.01, fail=True)
+    steady = StubServer("steady", latency=0.2)
+    router = RouterChatModel(targets=[flaky.model(), steady.model()], hedge_delay=None)
+    router.invoke("oi")
+    flaky.fail = False
+    answers = [router.invoke("oi").content for _ in range(5)]
+    results.append(check(f"alvo volta a ser usado após falha passageira ({answers})", answers[-1] == "flaky"))
+
+    # Circuit breaker e fallback local
+    broken = [StubServer("a", fail=True), StubServer("b", fail=True)]
+    router = RouterChatModel(targets=[s.model() for s in broken], fallbacks=[local.model()], hedge_delay=0.1,
+                             failure_threshold=1, recovery_timeout=60)
+    answers = [router.invoke("oi").content for _ in range(3)]
+    calls = sum(s.calls for s in broken)
+    results.append(check(f"circuito abre e o fallback local responde ({answers}, {calls} chamadas aos alvos)",
+                         answers == ["local"] * 3 and calls == 2))
+
+    # Concorrência: o roteador não limita as chamadas simultâneas do processo
+    a, b = StubServer("a", latency=0.5), StubServer("b", latency=0.5)
+    router = RouterChatModel(targets=[a.model(), b.model()], hedge_delay=None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(16) as executor:
+        list(executor.map(lambda _: router.invoke("oi"), range(16)))
+    elapsed = time.perf_counter() - start
+    results.append(check(f"16 chamadas simultâneas de 0.5s em {elapsed:.2f}s", elapsed < 1.0))
+
+    print(router.get_stats())
+    return all(results)
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if main() else 1)
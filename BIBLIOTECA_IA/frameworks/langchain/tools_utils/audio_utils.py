@@ -15,6 +15,18 @@ def autoplay_audio(file_path: str, placeholder, autoplay):
 
     placeholder.markdown(md, unsafe_allow_html=True)
 
+def get_client_openai(api_key=None):
+    """
+    Retorna um cliente da OpenAI cujas chamadas passam pelo escalonador de rate limit do processo.
+    Se `api_key` não for informada, usa a variável de ambiente OPENAI_API_KEY.
+    """
+    import os
+    from openai import OpenAI
+    from BIBLIOTECA_IA.models.rate_limit import get_http_client
+
+    api_key = api_key or os.getenv('OPENAI_API_KEY')
+    return OpenAI(api_key=api_key, http_client=get_http_client("openai", api_key))
+
 def gerar_audio(st, model, voice, resposta_obtida, autoplay):
     audio_file_path = "output.mp3"
     try:
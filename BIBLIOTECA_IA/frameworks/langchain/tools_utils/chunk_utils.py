@@ -0,0 +1,225 @@
+from array import array
+from collections.abc import Sequence
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+class ChunkSpan:
+    """
+    Referência a um trecho [start, end) de um texto-fonte compartilhado. O texto só é criado ao acessar `text`.
+    """
+
+    __slots__ = ("sources", "doc_id", "start", "end")
+
+    def __init__(self, sources, doc_id, start, end):
+        self.sources = sources
+        self.doc_id = doc_id
+        self.start = start
+        self.end = end
+
+    @property
+    def text(self):
+        return self.sources[self.doc_id][self.start:self.end]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"ChunkSpan(doc_id={self.doc_id}, start={self.start}, end={self.end})"
+
+
+class SpanChunks(Sequence):
+    """
+    Lista compacta de chunks representados como spans (doc_id, start, end) sobre textos-fonte compartilhados.
+
+    Em vez de guardar uma cópia de cada chunk (o que, com sobreposição, ocupa bem mais que o próprio documento),
+    guarda uma única cópia de cada texto-fonte e três arrays paralelos de inteiros. Indexar a lista materializa
+    o texto do chunk, de modo que ela pode ser usada onde uma `list[str]` é esperada; para evitar a cópia,
+    use `span(i)`.
+    """
+
+    def __init__(self, sources=None):
+        self.sources = list(sources or [])
+        self.doc_ids = array("l")
+        self.starts = array("q")
+        self.ends = array("q")
+
+    def add_source(self, text):
+        self.sources.append(text)
+        return len(self.sources) - 1
+
+    def append(self, doc_id, start, end):
+        self.doc_ids.append(doc_id)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def extend(self, other):
+        """
+        Acrescenta os chunks de outra `SpanChunks` (de outros documentos), reaproveitando seus textos-fonte.
+        """
+        offset = len(self.sources)
+        self.sources.extend(other.sources)
+        self.doc_ids.extend(doc_id + offset for doc_id in other.doc_ids)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+
+    def select(self, indices):
+        """
+        Retorna uma nova `SpanChunks` com apenas os chunks de `indices`, compartilhando os mesmos textos-fonte
+        (ex: os chunks mantidos por `deduplicate_chunks`, a partir do "chunk_index" dos metadados).
+        """
+        selected = SpanChunks(self.sources)
+        for index in indices:
+            selected.append(self.doc_ids[index], self.starts[index], self.ends[index])
+        return selected
+
+    def span(self, index):
+        return ChunkSpan(self.sources, self.doc_ids[index], self.starts[index], self.ends[index])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return self.sources[self.doc_ids[index]][self.starts[index]:self.ends[index]]
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __repr__(self):
+        return f"SpanChunks({len(self)} chunks, {len(self.sources)} fontes)"
+
+
+def split_text_to_spans(text, chunk_size=3000, chunk_overlap=1000, chunks=None):
+    """
+    Divide o texto como `get_chunks` e retorna os chunks como spans sobre uma única cópia do texto.
+
+    Parâmetros:
+    -----------
+    text : str
+        O texto a ser dividido.
+
+    chunk_size : int, opcional
+        O tamanho máximo de cada chunk (em número de caracteres). O padrão é 3000 caracteres.
+
+    chunk_overlap : int, opcional
+        A sobreposição entre os chunks. O padrão é 1000 caracteres.
+
+    chunks : SpanChunks, opcional
+        Uma `SpanChunks` existente à qual os novos chunks serão acrescentados (para vários documentos).
+
+    Retorno:
+    --------
+    SpanChunks
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    chunks = SpanChunks() if chunks is None else chunks
+    doc_id = chunks.add_source(text)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    search_from = 0
+    for chunk in text_splitter.split_text(text):
+        start = text.find(chunk, search_from)
+        if start == -1:
+            # Chunk que não é um trecho literal do texto: guarda-o como fonte própria
+            chunks.append(chunks.add_source(chunk), 0, len(chunk))
+            continue
+        chunks.append(doc_id, start, start + len(chunk))
+        search_from = start + 1
+    return chunks
+
+
+class SpanDocstore(Docstore, AddableMixin):
+    """
+    Docstore do FAISS que guarda spans e uma única cópia de cada texto-fonte, materializando o `Document`
+    apenas quando ele é buscado (ex: ao montar o contexto do prompt).
+
+    É serializado por `FAISS.save_local` como qualquer docstore, mantendo uma só cópia de cada texto.
+    """
+
+    def __init__(self, sources=None):
+        self.sources = list(sources or [])
+        self.rows = {}
+        self.doc_ids = array("l")
+        self.starts = array("q")
+        self.ends = array("q")
+        self.metadatas = {}
+
+    def add_span(self, id_, doc_id, start, end, metadata=None):
+        row = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        if metadata:
+            self.metadatas[row] = metadata
+        self.rows[id_] = row
+
+    def add(self, texts):
+        # Documentos adicionados depois (ex: FAISS.add_texts) viram fontes próprias
+        for id_, document in texts.items():
+            if id_ in self.rows:
+                raise ValueError(f"Tried to add ids that already exist: {id_}")
+            self.sources.append(document.page_content)
+            self.add_span(id_, len(self.sources) - 1, 0, len(document.page_content), document.metadata)
+
+    def delete(self, ids):
+        for id_ in ids:
+            self.rows.pop(id_)
+
+    def search(self, search):
+        row = self.rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        text = self.sources[self.doc_ids[row]][self.starts[row]:self.ends[row]]
+        return Document(page_content=text, metadata=dict(self.metadatas.get(row, {})), id=search)
+
+
+def build_span_vector_store(chunks, embeddings, metadatas=None, batch_size=256):
+    """
+    Cria um vector store FAISS a partir de uma `SpanChunks` sem manter cópias dos chunks.
+
+    O texto de cada chunk é materializado apenas no lote enviado ao modelo de embeddings e descartado em
+    seguida; o docstore guarda os spans e uma cópia de cada texto-fonte.
+
+    Parâmetros:
+    -----------
+    chunks : SpanChunks
+        Os chunks, como retornados por `get_chunks(..., as_spans=True)`.
+
+    embeddings : Embeddings
+        O modelo de embedding a ser usado.
+
+    metadatas : list of dict, opcional
+        Metadados de cada chunk.
+
+    batch_size : int, opcional
+        Quantidade de chunks por chamada de `embed_documents`. O padrão é 256.
+
+    Retorno:
+    --------
+    FAISS
+    """
+    import uuid
+    import numpy as np
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    docstore = SpanDocstore(chunks.sources)
+    index = None
+    index_to_docstore_id = {}
+
+    for start in range(0, len(chunks), batch_size):
+        vectors = np.asarray(embeddings.embed_documents(chunks[start:start + batch_size]), dtype=np.float32)
+        if index is None:
+            index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        for offset in range(len(vectors)):
+            position = start + offset
+            id_ = str(uuid.uuid4())
+            docstore.add_span(id_, chunks.doc_ids[position], chunks.starts[position], chunks.ends[position],
+                              metadatas[position] if metadatas else None)
+            index_to_docstore_id[position] = id_
+
+    if index is None:
+        raise ValueError("Não há chunks para vetorizar.")
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
@@ -0,0 +1,189 @@
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _shingles(text, shingle_size):
+    """
+    Retorna o conjunto de shingles (sequências de `shingle_size` palavras) do texto normalizado.
+    """
+    words = text.lower().split()
+    if len(words) <= shingle_size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)}
+
+
+def _lsh_params(threshold, num_perm, min_recall=0.99):
+    """
+    Escolhe o número de bandas e de linhas por banda (com bandas * linhas <= `num_perm`) para o LSH.
+
+    Um par com similaridade s vira candidato com probabilidade 1 - (1 - s^linhas)^bandas. Os candidatos ainda
+    são confirmados pela assinatura completa, então um falso positivo custa só uma comparação, enquanto um
+    falso negativo é uma duplicata perdida. Por isso exige-se que pares com similaridade `threshold` virem
+    candidatos com probabilidade de pelo menos `min_recall` (o ponto médio da curva fica bem abaixo do limiar)
+    e, entre essas opções, escolhe-se a com menos falsos positivos abaixo do limiar.
+    """
+    steps = 100
+
+    def probability(s, bands, rows):
+        return 1 - (1 - s ** rows) ** bands
+
+    best = None
+    for rows in range(1, num_perm + 1):
+        for bands in range(1, num_perm // rows + 1):
+            recall = probability(threshold, bands, rows)
+            false_positives = sum(probability(threshold * i / steps, bands, rows) for i in range(steps)) / steps
+            # Se nenhuma opção atinge min_recall, fica com a de maior recall
+            key = (recall < min_recall, -recall if recall < min_recall else false_positives)
+            if best is None or key < best[0]:
+                best = (key, bands, rows)
+    return best[1], best[2]
+
+
+def minhash_signatures(chunks, num_perm=128, shingle_size=5, seed=1):
+    """
+    Calcula a assinatura MinHash de cada chunk.
+
+    Parâmetros:
+    -----------
+    chunks : list of str
+        Os textos a serem assinados.
+
+    num_perm : int, opcional
+        Número de permutações (tamanho da assinatura). O padrão é 128.
+
+    shingle_size : int, opcional
+        Número de palavras por shingle. O padrão é 5.
+
+    seed : int, opcional
+        Semente das permutações, para assinaturas reprodutíveis.
+
+    Retorno:
+    --------
+    numpy.ndarray
+        Matriz (len(chunks), num_perm) de inteiros sem sinal.
+    """
+    import hashlib
+    import numpy as np
+
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, _MAX_HASH, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, _MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    signatures = np.empty((len(chunks), num_perm), dtype=np.uint64)
+    for row, chunk in enumerate(chunks):
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+             for s in _shingles(chunk, shingle_size)),
+            dtype=np.uint64,
+        )
+        # (a * h + b) mod p cabe em 64 bits porque a, b e h têm no máximo 32 bits
+        permuted = (np.outer(hashes, a) + b) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+        signatures[row] = permuted.min(axis=0)
+    return signatures
+
+
+def deduplicate_chunks(chunks, threshold=0.85, num_perm=128, shingle_size=5, keep="first"):
+    """
+    Remove chunks quase duplicados (cabeçalhos, rodapés, avisos legais, revisões do mesmo documento) antes de vetorizar.
+
+    Os chunks são assinados com MinHash e os pares candidatos são encontrados com LSH (bandas da assinatura).
+    Os grupos são formados em torno do chunk mantido: seguindo a ordem de `keep`, cada chunk ainda sem grupo
+    passa a ser mantido e absorve os candidatos sem grupo cuja similaridade de Jaccard estimada com ele seja
+    maior ou igual a `threshold`. Assim, todo chunk descartado é similar ao chunk mantido em seu lugar (e não
+    apenas a outro duplicado, como aconteceria agrupando os pares de forma transitiva). A origem dos chunks
+    descartados fica registrada nos metadados do chunk mantido.
+
+    Parâmetros:
+    -----------
+    chunks : list of str
+        Os chunks retornados por `get_chunks`.
+
+    threshold : float, opcional
+        Similaridade de Jaccard (entre 0 e 1) a partir da qual dois chunks são considerados duplicados. O padrão é 0.85.
+
+    num_perm : int, opcional
+        Tamanho da assinatura MinHash. Valores maiores são mais precisos e mais lentos. O padrão é 128.
+
+    shingle_size : int, opcional
+        Número de palavras por shingle. O padrão é 5.
+
+    keep : str, opcional
+        Qual chunk de cada grupo manter: "first" (o primeiro na ordem original) ou "longest" (o mais longo,
+        útil quando as cópias são revisões do mesmo texto). O padrão é "first".
+
+    Retorno:
+    --------
+    tuple (list of str, list of dict, dict)
+        - Os chunks mantidos, na ordem original.
+        - Os metadados de cada chunk mantido: "chunk_index" (posição em `chunks`), "duplicate_indices"
+          (posições dos chunks descartados por serem duplicados dele) e "duplicate_count".
+        - Um relatório com "total_chunks", "kept_chunks", "removed_chunks" e "dedup_ratio" (fração removida).
+
+    Exceções:
+    ----------
+    ValueError:
+        Se `threshold` não estiver entre 0 e 1 ou `keep` não for "first" ou "longest".
+
+    Exemplos:
+    ---------
+    >>> chunks = get_chunks(get_pdf_text("manual.pdf"))
+    >>> chunks, metadatas, report = deduplicate_chunks(chunks, threshold=0.85)
+    >>> print(f"{report['dedup_ratio']:.1%} dos chunks eram duplicados")
+    >>> vector_store = load_or_create_vector_store(chunks, embeddings, metadatas=metadatas)
+    """
+    if not 0 < threshold <= 1:
+        raise ValueError("O parâmetro 'threshold' deve estar entre 0 e 1.")
+    if keep not in ("first", "longest"):
+        raise ValueError(f"Valor de 'keep' '{keep}' não reconhecido. Escolha entre 'first' ou 'longest'.")
+
+    import numpy as np
+
+    chunks = list(chunks)
+    signatures = minhash_signatures(chunks, num_perm=num_perm, shingle_size=shingle_size)
+    bands, rows = _lsh_params(threshold, num_perm)
+
+    # Buckets do LSH em que cada chunk caiu (um por banda)
+    buckets_of = [[] for _ in chunks]
+    for band in range(bands):
+        buckets = {}
+        for index, signature in enumerate(signatures):
+            bucket = buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), [])
+            bucket.append(index)
+            buckets_of[index].append(bucket)
+
+    if keep == "longest":
+        order = sorted(range(len(chunks)), key=lambda i: (-len(chunks[i]), i))
+    else:
+        order = range(len(chunks))
+
+    # Agrupamento por líder: cada chunk só entra no grupo de um chunk mantido com o qual atinge o limiar
+    assigned = [False] * len(chunks)
+    kept = []
+    for leader in order:
+        if assigned[leader]:
+            continue
+        assigned[leader] = True
+        candidates = {index for bucket in buckets_of[leader] for index in bucket if not assigned[index]}
+        duplicates = []
+        if candidates:
+            candidates = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            # Confirma os candidatos pela similaridade estimada com a assinatura completa
+            similarities = (signatures[candidates] == signatures[leader]).mean(axis=1)
+            for index in candidates[similarities >= threshold].tolist():
+                assigned[index] = True
+                duplicates.append(index)
+        kept.append((leader, sorted(duplicates)))
+    kept.sort()
+
+    total = len(chunks)
+    report = {
+        "total_chunks": total,
+        "kept_chunks": len(kept),
+        "removed_chunks": total - len(kept),
+        "dedup_ratio": (total - len(kept)) / total if total else 0.0,
+    }
+    metadatas = [
+        {"chunk_index": index, "duplicate_indices": duplicates, "duplicate_count": len(duplicates)}
+        for index, duplicates in kept
+    ]
+    return [chunks[index] for index, _ in kept], metadatas, report
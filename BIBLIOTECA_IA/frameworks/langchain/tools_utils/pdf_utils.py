@@ -0,0 +1,234 @@
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import tempfile
+
+# Ordem de preferência quando o backend é escolhido automaticamente (do mais rápido ao mais lento)
+AUTO_BACKEND_ORDER = ["pypdfium2", "pypdf2", "pdfminer"]
+DEFAULT_BACKEND = "pypdf2"
+
+
+class PdfBackend:
+    """
+    Interface de um backend de extração de texto de PDF.
+
+    Um backend recebe o conteúdo do PDF em bytes e sabe informar o número de páginas e extrair o texto de
+    um subconjunto delas. Para adicionar um backend, crie uma subclasse e registre-a em `PDF_BACKENDS`.
+    """
+
+    name = None
+    module = None
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    def page_count(self, data):
+        raise NotImplementedError
+
+    def extract_pages(self, data, page_indices):
+        """
+        Retorna um dicionário {índice da página: texto} para as páginas pedidas.
+        """
+        raise NotImplementedError
+
+
+class PyPDF2Backend(PdfBackend):
+    name = "pypdf2"
+    module = "PyPDF2"
+
+    def page_count(self, data):
+        from PyPDF2 import PdfReader
+        return len(PdfReader(io.BytesIO(data)).pages)
+
+    def extract_pages(self, data, page_indices):
+        from PyPDF2 import PdfReader
+        reader = PdfReader(io.BytesIO(data))
+        return {index: reader.pages[index].extract_text() or "" for index in page_indices}
+
+
+class PdfiumBackend(PdfBackend):
+    name = "pypdfium2"
+    module = "pypdfium2"
+
+    def page_count(self, data):
+        import pypdfium2 as pdfium
+        document = pdfium.PdfDocument(data)
+        try:
+            return len(document)
+        finally:
+            document.close()
+
+    def extract_pages(self, data, page_indices):
+        import pypdfium2 as pdfium
+        document = pdfium.PdfDocument(data)
+        texts = {}
+        try:
+            for index in page_indices:
+                page = document[index]
+                textpage = page.get_textpage()
+                texts[index] = textpage.get_text_range().replace("\r\n", "\n")
+                textpage.close()
+                page.close()
+        finally:
+            document.close()
+        return texts
+
+
+class PdfminerBackend(PdfBackend):
+    name = "pdfminer"
+    module = "pdfminer"
+
+    def page_count(self, data):
+        from pdfminer.pdfpage import PDFPage
+        return sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+    def extract_pages(self, data, page_indices):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        page_indices = sorted(page_indices)
+        texts = {}
+        for index, layout in zip(page_indices, extract_pages(io.BytesIO(data), page_numbers=page_indices)):
+            texts[index] = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+        return texts
+
+
+PDF_BACKENDS = {backend.name: backend for backend in (PyPDF2Backend, PdfiumBackend, PdfminerBackend)}
+
+
+def get_pdf_backend(name=None):
+    """
+    Retorna uma instância do backend de extração de PDF.
+
+    Parâmetros:
+    -----------
+    name : str, opcional
+        O nome do backend: "pypdf2", "pypdfium2", "pdfminer" ou "auto" (o mais rápido instalado).
+        Se não informado, usa a variável de ambiente BIBLIOTECA_IA_PDF_BACKEND ou, na falta dela, "pypdf2".
+
+    Exceções:
+    ----------
+    ValueError:
+        Se o backend não for reconhecido ou não estiver instalado.
+    """
+    name = (name or os.getenv("BIBLIOTECA_IA_PDF_BACKEND") or DEFAULT_BACKEND).lower()
+
+    if name == "auto":
+        for candidate in AUTO_BACKEND_ORDER:
+            if PDF_BACKENDS[candidate].is_available():
+                return PDF_BACKENDS[candidate]()
+        raise ValueError("Nenhum backend de extração de PDF está instalado.")
+
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Backend de PDF '{name}' não reconhecido. Escolha entre {list(PDF_BACKENDS)} ou 'auto'.")
+    if not PDF_BACKENDS[name].is_available():
+        raise ValueError(f"O backend de PDF '{name}' não está instalado (pacote '{PDF_BACKENDS[name].module}').")
+    return PDF_BACKENDS[name]()
+
+
+class PdfTextCache:
+    """
+    Cache em disco do texto extraído, por (sha256 do arquivo, backend, página).
+
+    Estrutura: <cache_dir>/<sha256>/<backend>/pages.json (número de páginas) e <página>.txt. Quando o número
+    de páginas e todas as páginas já estão no cache, o PDF não precisa nem ser aberto.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+
+    def _dir(self, digest, backend_name):
+        return os.path.join(self.cache_dir, digest, backend_name)
+
+    def get_page_count(self, digest, backend_name):
+        path = os.path.join(self._dir(digest, backend_name), "pages.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return json.load(f)["page_count"]
+
+    def set_page_count(self, digest, backend_name, page_count):
+        self._write(os.path.join(self._dir(digest, backend_name), "pages.json"), json.dumps({"page_count": page_count}))
+
+    def get_page(self, digest, backend_name, index):
+        path = os.path.join(self._dir(digest, backend_name), f"{index}.txt")
+        if not os.path.exists(path):
+            return None
+        # newline="" preserva "\r" e "\r\n" do texto extraído: um acerto no cache devolve exatamente o mesmo texto
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def set_page(self, digest, backend_name, index, text):
+        self._write(os.path.join(self._dir(digest, backend_name), f"{index}.txt"), text)
+
+    @staticmethod
+    def _write(path, content):
+        # Escrita atômica para que processos concorrentes nunca leiam um arquivo pela metade
+        # (o nome temporário é único por arquivo criado, não só por processo, para threads do mesmo processo)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", dir=directory, suffix=".tmp",
+                                         delete=False) as f:
+            f.write(content)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+
+def _read_bytes(document_path):
+    if hasattr(document_path, "read"):
+        if hasattr(document_path, "seek"):
+            document_path.seek(0)
+        return document_path.read()
+    with open(document_path, "rb") as f:
+        return f.read()
+
+
+def extract_pdf_pages(document_path, backend=None, cache_dir=None):
+    """
+    Extrai o texto de cada página de um PDF, usando o backend escolhido e, opcionalmente, o cache em disco.
+
+    Parâmetros:
+    -----------
+    document_path : str ou file-like object
+        O arquivo PDF (caminho ou objeto file-like, como um arquivo enviado pelo Streamlit).
+
+    backend : str, opcional
+        O backend de extração (veja `get_pdf_backend`).
+
+    cache_dir : str, opcional
+        Diretório do cache de texto extraído. Se não informado, usa a variável de ambiente
+        BIBLIOTECA_IA_PDF_CACHE; se ela também não existir, o cache não é usado.
+
+    Retorno:
+    --------
+    list of str
+        O texto de cada página, na ordem do documento.
+    """
+    pdf_backend = get_pdf_backend(backend)
+    data = _read_bytes(document_path)
+    cache_dir = cache_dir or os.getenv("BIBLIOTECA_IA_PDF_CACHE")
+
+    if not cache_dir:
+        return [text for _, text in sorted(pdf_backend.extract_pages(data, range(pdf_backend.page_count(data))).items())]
+
+    cache = PdfTextCache(cache_dir)
+    digest = hashlib.sha256(data).hexdigest()
+
+    page_count = cache.get_page_count(digest, pdf_backend.name)
+    if page_count is None:
+        page_count = pdf_backend.page_count(data)
+        cache.set_page_count(digest, pdf_backend.name, page_count)
+
+    pages = [cache.get_page(digest, pdf_backend.name, index) for index in range(page_count)]
+    missing = [index for index, text in enumerate(pages) if text is None]
+    if missing:
+        for index, text in pdf_backend.extract_pages(data, missing).items():
+            cache.set_page(digest, pdf_backend.name, index, text)
+            pages[index] = text
+    return pages
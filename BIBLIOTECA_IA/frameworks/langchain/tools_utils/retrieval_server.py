@@ -0,0 +1,490 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    # Vários workers podem conectar ao mesmo tempo na inicialização
+    request_queue_size = 128
+
+
+class _PendingQuery:
+    __slots__ = ("query", "embedding", "k", "filter", "fetch_k", "search_type", "lambda_mult", "relevance",
+                 "done", "result", "error")
+
+    def __init__(self, query, embedding, k=4, filter=None, fetch_k=20, search_type="similarity", lambda_mult=0.5,
+                 relevance=False):
+        self.query = query
+        self.embedding = embedding
+        self.k = k
+        self.filter = filter
+        self.fetch_k = fetch_k
+        self.search_type = search_type
+        self.lambda_mult = lambda_mult
+        self.relevance = relevance
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    @property
+    def is_plain(self):
+        return self.search_type == "similarity" and self.filter is None
+
+
+class RetrievalServer:
+    """
+    Servidor local de busca que carrega o vector store uma única vez e responde consultas top-k por um Unix socket.
+
+    Consultas que chegam ao mesmo tempo (de workers do gunicorn ou processos do Streamlit diferentes) são
+    agrupadas em micro-lotes: até `max_batch_size` consultas, esperando no máximo `max_wait` segundos pelas
+    seguintes, são vetorizadas com uma única chamada ao modelo de embeddings (com a semântica de consulta, veja
+    `embed_queries`) e as buscas simples são feitas com uma única busca no FAISS. Buscas com `filter` ou MMR usam
+    os métodos do próprio vector store. Cada consulta é validada separadamente: uma consulta inválida recebe
+    seu erro sem afetar as demais do lote.
+
+    Protocolo: uma linha JSON por requisição e uma por resposta.
+        - Busca: {"query": str} ou {"embedding": [float]}, com as opções "k", "filter", "fetch_k",
+          "search_type" ("similarity" ou "mmr"), "lambda_mult" e "relevance" (scores de relevância entre 0 e 1).
+          Resposta: {"results": [[doc_id, page_content, metadata, score], ...]} ou {"error": str}.
+        - Lote: {"queries": [str, ...]} com as mesmas opções. Resposta: {"batch": [resposta de cada consulta]}.
+        - {"op": "ping"}. Resposta: {"ok": true}.
+    """
+
+    def __init__(self, vector_store, socket_path, max_batch_size=64, max_wait=0.005):
+        self.vector_store = vector_store
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._server = None
+        self._batcher = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def _enqueue(self, query=None, embedding=None, **options):
+        if query is None and embedding is None:
+            raise ValueError("Informe 'query' ou 'embedding'.")
+        pending = _PendingQuery(query, embedding, **options)
+        self._queue.put(pending)
+        return pending
+
+    def submit(self, query=None, embedding=None, **options):
+        """
+        Busca uma consulta e retorna uma lista de (doc_id, Document, score). Bloqueia até o lote ser processado.
+        """
+        pending = self._enqueue(query, embedding, **options)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _validate(self, pending):
+        if isinstance(pending.k, bool) or not isinstance(pending.k, int) or pending.k < 1:
+            raise ValueError(f"'k' deve ser um inteiro maior ou igual a 1 (recebido: {pending.k!r}).")
+        if isinstance(pending.fetch_k, bool) or not isinstance(pending.fetch_k, int) or pending.fetch_k < 1:
+            raise ValueError(f"'fetch_k' deve ser um inteiro maior ou igual a 1 (recebido: {pending.fetch_k!r}).")
+        if pending.search_type not in ("similarity", "mmr"):
+            raise ValueError(f"'search_type' deve ser 'similarity' ou 'mmr' (recebido: {pending.search_type!r}).")
+        if pending.filter is not None and not isinstance(pending.filter, dict):
+            raise ValueError("'filter' deve ser um dicionário.")
+        if not 0 <= float(pending.lambda_mult) <= 1:
+            raise ValueError(f"'lambda_mult' deve estar entre 0 e 1 (recebido: {pending.lambda_mult!r}).")
+        embedding = [float(value) for value in pending.embedding]
+        dimension = self.vector_store.index.d
+        if len(embedding) != dimension:
+            raise ValueError(f"O embedding tem dimensão {len(embedding)}, mas o índice tem dimensão {dimension}.")
+        pending.embedding = embedding
+
+    def _search(self, pending):
+        # Buscas com filtro ou MMR não entram na busca matricial: usam os métodos do próprio FAISS
+        if pending.search_type == "mmr":
+            docs = self.vector_store.max_marginal_relevance_search_with_score_by_vector(
+                pending.embedding, k=pending.k, fetch_k=pending.fetch_k, lambda_mult=pending.lambda_mult,
+                filter=pending.filter,
+            )
+        else:
+            docs = self.vector_store.similarity_search_with_score_by_vector(
+                pending.embedding, k=pending.k, filter=pending.filter, fetch_k=pending.fetch_k,
+            )
+        return [(doc.id, doc, score) for doc, score in docs]
+
+    def _run_batch(self, batch):
+        from BIBLIOTECA_IA.frameworks.langchain.tools_utils.text_utils import batch_similarity_search
+        from BIBLIOTECA_IA.models.embeddings import embed_queries
+
+        try:
+            to_embed = [pending for pending in batch if pending.embedding is None]
+            if to_embed:
+                try:
+                    embeddings = getattr(self.vector_store, "embeddings", None) or self.vector_store.embedding_function
+                    vectors = embed_queries(embeddings, [pending.query for pending in to_embed])
+                    for pending, vector in zip(to_embed, vectors):
+                        pending.embedding = vector
+                except Exception as e:
+                    for pending in to_embed:
+                        pending.error = e
+
+            valid = []
+            for pending in batch:
+                if pending.error is not None:
+                    continue
+                try:
+                    self._validate(pending)
+                    valid.append(pending)
+                except Exception as e:
+                    pending.error = e
+
+            plain = [pending for pending in valid if pending.is_plain]
+            if plain:
+                try:
+                    k = max(pending.k for pending in plain)
+                    rows = batch_similarity_search(self.vector_store, [pending.embedding for pending in plain], k)
+                    for pending, row in zip(plain, rows):
+                        pending.result = row[:pending.k]
+                except Exception as e:
+                    for pending in plain:
+                        pending.error = e
+
+            for pending in valid:
+                try:
+                    if not pending.is_plain:
+                        pending.result = self._search(pending)
+                    if pending.relevance and pending.error is None:
+                        relevance_score_fn = self.vector_store._select_relevance_score_fn()
+                        pending.result = [(doc_id, doc, relevance_score_fn(score)) for doc_id, doc, score in pending.result]
+                except Exception as e:
+                    pending.error = e
+        finally:
+            for pending in batch:
+                pending.done.set()
+
+    def _batch_loop(self):
+        while True:
+            batch = self._next_batch()
+            if any(pending is None for pending in batch):
+                # Sinal de parada enviado por shutdown()
+                self._run_batch([pending for pending in batch if pending is not None])
+                return
+            self._run_batch(batch)
+
+    @staticmethod
+    def _encode(pending):
+        if pending.error is not None:
+            return {"error": f"{type(pending.error).__name__}: {pending.error}"}
+        return {"results": [[doc_id, doc.page_content, doc.metadata, score] for doc_id, doc, score in pending.result]}
+
+    def _remove_stale_socket(self):
+        """
+        Remove o socket de um servidor que não está mais no ar. Recusa-se a substituir um servidor ativo.
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+            raise RuntimeError(f"'{self.socket_path}' já existe e não é um socket.")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except ConnectionRefusedError:
+            # Socket órfão de um servidor que terminou sem removê-lo
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        else:
+            raise RuntimeError(f"Já existe um servidor de busca ouvindo em '{self.socket_path}'.")
+        finally:
+            probe.close()
+
+    def serve_forever(self):
+        """
+        Inicia o servidor e bloqueia até `shutdown()` ser chamado.
+
+        Exceções:
+        ----------
+        RuntimeError:
+            Se outro servidor já estiver ouvindo em `socket_path`.
+        """
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        if request.get("op") == "ping":
+                            response = {"ok": True}
+                        elif "queries" in request:
+                            options = {key: value for key, value in request.items() if key != "queries"}
+                            pendings = [server._enqueue(query, **options) for query in request["queries"]]
+                            for pending in pendings:
+                                pending.done.wait()
+                            response = {"batch": [server._encode(pending) for pending in pendings]}
+                        else:
+                            pending = server._enqueue(**request)
+                            pending.done.wait()
+                            response = server._encode(pending)
+                    except Exception as e:
+                        response = {"error": f"{type(e).__name__}: {e}"}
+                    self.wfile.write(json.dumps(response, default=str).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        try:
+            self._remove_stale_socket()
+            self._server = _UnixServer(self.socket_path, Handler)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            raise
+
+        self._batcher = threading.Thread(target=self._batch_loop, daemon=True)
+        self._batcher.start()
+
+        # Apenas o usuário dono do processo pode consultar o índice
+        os.chmod(self.socket_path, 0o600)
+        self._ready.set()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+        self._queue.put(None)
+
+
+def serve_vector_store(vector_store, socket_path, max_batch_size=64, max_wait=0.005, background=False):
+    """
+    Serve um vector store já carregado por um Unix socket local, para ser compartilhado por vários processos.
+
+    Parâmetros:
+    -----------
+    vector_store : FAISS
+        O vector store, como retornado por `load_or_create_vector_store`.
+
+    socket_path : str
+        Caminho do Unix socket (ex: "/tmp/biblioteca_ia_retrieval.sock").
+
+    max_batch_size : int, opcional
+        Número máximo de consultas agrupadas em uma única busca. O padrão é 64.
+
+    max_wait : float, opcional
+        Tempo máximo, em segundos, que a primeira consulta de um lote espera pelas seguintes. O padrão é 0.005.
+
+    background : bool, opcional
+        Se True, inicia o servidor em uma thread e retorna imediatamente. O padrão é False (bloqueia).
+
+    Retorno:
+    --------
+    RetrievalServer
+        O servidor (use `shutdown()` para pará-lo).
+
+    Exceções:
+    ----------
+    RuntimeError:
+        Se outro servidor já estiver ouvindo em `socket_path`.
+
+    Exemplos:
+    ---------
+    >>> vector_store = load_or_create_vector_store(None, embeddings, file_path="indice_faiss")
+    >>> serve_vector_store(vector_store, "/tmp/biblioteca_ia_retrieval.sock")
+    """
+    server = RetrievalServer(vector_store, socket_path, max_batch_size=max_batch_size, max_wait=max_wait)
+    if background:
+        def run():
+            try:
+                server.serve_forever()
+            except Exception:
+                pass  # o erro fica em server._error e é levantado abaixo
+
+        threading.Thread(target=run, daemon=True).start()
+        # Aguarda o socket ser criado para que clientes possam conectar em seguida
+        if not server._ready.wait(timeout=10):
+            raise RuntimeError(f"O servidor de busca não conseguiu abrir o socket '{socket_path}'.")
+        if server._error is not None:
+            raise server._error
+    else:
+        server.serve_forever()
+    return server
+
+
+class RemoteVectorStore(VectorStore):
+    """
+    Cliente do `RetrievalServer` com a interface de `VectorStore`, para ser usado no lugar do FAISS local
+    (`similarity_search`, `similarity_search_with_score`, `max_marginal_relevance_search`,
+    `similarity_search_with_relevance_scores` e `as_retriever` com qualquer `search_type`).
+
+    As consultas são vetorizadas no servidor, com o modelo de embeddings do índice. São aceitos os parâmetros
+    `filter` (apenas dicionários, já que funções não podem ser enviadas ao servidor) e `fetch_k`; outros
+    parâmetros levantam ValueError em vez de serem ignorados.
+
+    Cada thread mantém sua própria conexão com o servidor. O índice é somente leitura: `add_texts` não é suportado.
+    """
+
+    def __init__(self, socket_path, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def embeddings(self):
+        return None
+
+    def ping(self, timeout=1.0):
+        """
+        Retorna True se houver um servidor de busca respondendo em `socket_path`.
+        """
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout)
+                sock.connect(self.socket_path)
+                with sock.makefile("rwb") as stream:
+                    stream.write(b'{"op": "ping"}\n')
+                    stream.flush()
+                    return json.loads(stream.readline() or b"{}").get("ok") is True
+        except (OSError, ValueError):
+            return False
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            sock.settimeout(self.timeout)
+            connection = (sock, sock.makefile("rwb"))
+            self._local.connection = connection
+        return connection
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection[1].close()
+            connection[0].close()
+            self._local.connection = None
+
+    def _request(self, payload):
+        line = json.dumps(payload).encode("utf-8") + b"\n"
+        # Tenta reconectar uma vez caso o servidor tenha sido reiniciado
+        for attempt in range(2):
+            try:
+                _, stream = self._connection()
+                stream.write(line)
+                stream.flush()
+                response = stream.readline()
+                if not response:
+                    raise ConnectionError("Conexão encerrada pelo servidor de busca.")
+                break
+            except (OSError, ConnectionError):
+                self._close()
+                if attempt:
+                    raise
+        return json.loads(response)
+
+    @staticmethod
+    def _results(response):
+        if "error" in response:
+            raise RuntimeError(f"Erro no servidor de busca: {response['error']}")
+        return [(doc_id, Document(page_content=text, metadata=metadata, id=doc_id), score)
+                for doc_id, text, metadata, score in response["results"]]
+
+    @staticmethod
+    def _options(k, kwargs, allowed=("filter", "fetch_k")):
+        unsupported = set(kwargs) - set(allowed)
+        if unsupported:
+            raise ValueError(f"Parâmetros não suportados pelo RemoteVectorStore: {sorted(unsupported)}.")
+        if callable(kwargs.get("filter")):
+            raise ValueError("O RemoteVectorStore aceita apenas filtros em dicionário; funções não podem ser "
+                             "enviadas ao servidor de busca.")
+        return {"k": k, **{key: value for key, value in kwargs.items() if value is not None}}
+
+    def _search(self, payload):
+        return [(doc, score) for _, doc, score in self._results(self._request(payload))]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self._search({"query": query, **self._options(k, kwargs)})
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        return self._search({"embedding": list(embedding), **self._options(k, kwargs)})
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def _similarity_search_with_relevance_scores(self, query, k=4, **kwargs):
+        # Os scores são normalizados no servidor, que conhece a estratégia de distância do índice
+        return self._search({"query": query, "relevance": True, **self._options(k, kwargs)})
+
+    def max_marginal_relevance_search(self, query, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        options = self._options(k, kwargs, allowed=("filter",))
+        payload = {"query": query, "search_type": "mmr", "fetch_k": fetch_k, "lambda_mult": lambda_mult, **options}
+        return [doc for doc, _ in self._search(payload)]
+
+    def max_marginal_relevance_search_by_vector(self, embedding, k=4, fetch_k=20, lambda_mult=0.5, **kwargs):
+        options = self._options(k, kwargs, allowed=("filter",))
+        payload = {"embedding": list(embedding), "search_type": "mmr", "fetch_k": fetch_k,
+                   "lambda_mult": lambda_mult, **options}
+        return [doc for doc, _ in self._search(payload)]
+
+    def batch_search(self, queries, k=4, **kwargs):
+        """
+        Busca várias consultas com uma única requisição, que o servidor processa no mesmo micro-lote.
+
+        Retorna, para cada consulta, uma lista de (doc_id, Document, score), como `batch_similarity_search`.
+        """
+        response = self._request({"queries": list(queries), **self._options(k, kwargs)})
+        if "error" in response:
+            raise RuntimeError(f"Erro no servidor de busca: {response['error']}")
+        return [self._results(item) for item in response["batch"]]
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("O RemoteVectorStore é somente leitura; adicione os textos no processo do servidor.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Use load_or_create_vector_store e serve_vector_store para criar o índice.")
+
+
+if __name__ == "__main__":
+    import argparse
+    from BIBLIOTECA_IA.models.embeddings import get_embeddings
+    from langchain_community.vectorstores import FAISS
+
+    parser = argparse.ArgumentParser(description="Servidor local de busca sobre um índice FAISS salvo.")
+    parser.add_argument("--file-path", required=True, help="Diretório do índice salvo por load_or_create_vector_store.")
+    parser.add_argument("--socket", required=True, help="Caminho do Unix socket.")
+    parser.add_argument("--embeddings", default="Openai", help='Provedor de embeddings ("Openai" ou "Google").')
+    parser.add_argument("--model", default="text-embedding-3-small", help="Modelo de embeddings usado no índice.")
+    parser.add_argument("--api-key-env", default="OPENAI_API_KEY", help="Variável de ambiente com a chave de API.")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.005)
+    args = parser.parse_args()
+
+    embeddings = get_embeddings(args.embeddings, args.model, os.getenv(args.api_key_env))
+    # O índice foi salvo pelo próprio usuário com load_or_create_vector_store
+    vector_store = FAISS.load_local(args.file_path, embeddings, allow_dangerous_deserialization=True)
+    serve_vector_store(vector_store, args.socket, max_batch_size=args.max_batch_size, max_wait=args.max_wait)
@@ -1,14 +1,21 @@
-def get_pdf_text(document_path):
+def get_pdf_text(document_path, backend=None, cache_dir=None):
     """
     Função que extrai todo o texto de um arquivo PDF.
 
-    Esta função utiliza a biblioteca PyPDF2 para ler o conteúdo de um arquivo PDF e extrair o texto de todas as páginas do documento. O texto extraído de cada página é concatenado para formar uma única string, que é retornada como resultado.
+    Esta função lê o conteúdo de um arquivo PDF e extrai o texto de todas as páginas do documento. O texto extraído de cada página é concatenado para formar uma única string, que é retornada como resultado.
+    Por padrão é usada a biblioteca PyPDF2; outros backends (pypdfium2, mais rápido, ou pdfminer) podem ser escolhidos pelo parâmetro `backend` ou pela variável de ambiente BIBLIOTECA_IA_PDF_BACKEND. Com `cache_dir`, o texto de cada página fica em cache em disco e o reprocessamento do mesmo arquivo não precisa abrir o PDF.
 
     Parâmetros:
     -----------
     document_path : str ou file-like object
         O arquivo PDF do qual o texto será extraído. Pode ser um caminho de arquivo em formato string ou um objeto file-like (como um arquivo aberto).
 
+    backend : str, opcional
+        O backend de extração: "pypdf2" (padrão), "pypdfium2", "pdfminer" ou "auto" (o mais rápido instalado).
+
+    cache_dir : str, opcional
+        Diretório do cache de texto extraído, indexado por (sha256 do arquivo, página, backend). Se não informado, usa a variável de ambiente BIBLIOTECA_IA_PDF_CACHE, ou nenhum cache.
+
     Retorno:
     --------
     str
@@ -17,26 +24,22 @@ def get_pdf_text(document_path):
     Exceções:
     ----------
     ValueError:
-        Se o arquivo fornecido não for um arquivo PDF válido.
+        Se o arquivo fornecido não for um arquivo PDF válido, ou se o backend não for reconhecido ou não estiver instalado.
 
     Exemplos:
     ---------
     >>> document_path = "path/to/document.pdf"
     >>> text = get_pdf_text(document_path)
     >>> print(text)  # Exibe o texto extraído do PDF.
-    """
-    from PyPDF2 import PdfReader
 
-    text = ""
-    pdf_reader = PdfReader(document_path)
-    for page in pdf_reader.pages:
-        page_text = page.extract_text() or ""
-        text += page_text
+    >>> text = get_pdf_text(document_path, backend="auto", cache_dir=".cache/pdf_text")
+    """
+    from BIBLIOTECA_IA.frameworks.langchain.tools_utils.pdf_utils import extract_pdf_pages
 
-    return text
+    return "".join(extract_pdf_pages(document_path, backend=backend, cache_dir=cache_dir))
 
 
-def get_chunks(text, chunk_size=3000, chunk_overlap=1000):
+def get_chunks(text, chunk_size=3000, chunk_overlap=1000, as_spans=False):
     """
     Função que divide o texto em chunks de tamanho fixo, com sobreposição entre eles.
 
@@ -53,11 +56,15 @@ def get_chunks(text, chunk_size=3000, chunk_overlap=1000):
     chunk_overlap : int, opcional
         A sobreposição entre os chunks, ou seja, o número de caracteres que serão repetidos no final de um chunk e no início do próximo. O valor padrão é 1000 caracteres.
 
+    as_spans : bool, opcional
+        Se True, retorna uma `SpanChunks`: os chunks ficam guardados como spans (início, fim) sobre uma única cópia do texto, em vez de uma cópia por chunk, reduzindo o uso de memória em corpora grandes. O valor padrão é False.
+
     Retorno:
     --------
-    list of str
+    list of str ou SpanChunks
         Uma lista de strings (chunks), onde cada string representa uma parte do texto original.
         O tamanho de cada chunk é limitado pelo parâmetro `chunk_size`, e a sobreposição entre os chunks é determinada pelo parâmetro `chunk_overlap`.
+        Com `as_spans=True`, uma `SpanChunks`, que se comporta como uma sequência de strings mas só cria o texto de cada chunk quando ele é acessado.
 
     Exceções:
     ----------
@@ -79,24 +86,35 @@ def get_chunks(text, chunk_size=3000, chunk_overlap=1000):
             print(chunk)
             print("-" * 50)
     """
+    if as_spans:
+        from BIBLIOTECA_IA.frameworks.langchain.tools_utils.chunk_utils import split_text_to_spans
+        return split_text_to_spans(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
     from langchain.text_splitter import RecursiveCharacterTextSplitter
 
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     return text_splitter.split_text(text)
 
 
-def load_or_create_vector_store(text_chunks, embeddings, file_path=None, st=None, use_flask_session=None):
+def load_or_create_vector_store(text_chunks, embeddings, file_path=None, st=None, use_flask_session=None, metadatas=None,
+                                retrieval_socket=None):
     import os
     from langchain_community.vectorstores import FAISS
+    from BIBLIOTECA_IA.frameworks.langchain.tools_utils.chunk_utils import SpanChunks, build_span_vector_store
     """
     Carrega ou cria um FAISS vector store, armazenando em diferentes lugares.
 
     Parameters:
-    - text_chunks: Lista de strings de textos para vetorizar.
+    - text_chunks: Lista de strings de textos para vetorizar, ou uma `SpanChunks` (veja `get_chunks(..., as_spans=True)`),
+      caso em que o docstore guarda apenas os spans e uma cópia de cada texto-fonte.
     - embeddings: O modelo de embedding a ser usado.
     - st: Se fornecido, usará o Streamlit para armazenar os vetores.
     - file_path: Caminho do arquivo para salvar/ler os vetores.
     - use_flask_session: Se True, armazenará na sessão do Flask.
+    - metadatas: Lista opcional de metadados, um por chunk (ex: a proveniência retornada por `deduplicate_chunks`).
+    - retrieval_socket: Caminho do Unix socket de um servidor de busca (veja `serve_vector_store`). Se o servidor
+      responder, retorna um `RemoteVectorStore` que consulta o índice compartilhado em vez de carregá-lo; caso
+      contrário (servidor parado ou socket órfão), segue para o carregamento local.
 
     Returns:
     - vector_store: O vetor store FAISS.
@@ -108,13 +126,25 @@ def load_or_create_vector_store(text_chunks, embeddings, file_path=None, st=None
             vector_store = st.session_state['vector_store']
             return vector_store
 
+    # Tentativa de usar o servidor de busca compartilhado entre os processos
+    if retrieval_socket:
+        from BIBLIOTECA_IA.frameworks.langchain.tools_utils.retrieval_server import RemoteVectorStore
+        vector_store = RemoteVectorStore(retrieval_socket)
+        if vector_store.ping():
+            if st:
+                st.session_state['vector_store'] = vector_store
+            return vector_store
+
     # Tentativa de carregar de arquivo
     if file_path and os.path.exists(file_path):
         vector_store = FAISS.load_local(file_path, embeddings)
         return vector_store
 
     # Caso não tenha sido carregado, cria o vetor
-    vector_store = FAISS.from_texts(text_chunks, embedding=embeddings)
+    if isinstance(text_chunks, SpanChunks):
+        vector_store = build_span_vector_store(text_chunks, embeddings, metadatas=metadatas)
+    else:
+        vector_store = FAISS.from_texts(text_chunks, embedding=embeddings, metadatas=metadatas)
 
     # Salva os vetores de volta ao Streamlit (se aplicável)
     if st:
@@ -177,3 +207,157 @@ def get_conversational_chain(model, prompt_template, chain_type):
         chain_type=chain_type,
         prompt=PromptTemplate(template=prompt_template, input_variables=["context", "question"])
     )
+
+
+def batch_similarity_search(vector_store, query_vectors, k=4):
+    """
+    Executa uma única busca matricial no índice FAISS para vários vetores de consulta.
+
+    Parâmetros:
+    -----------
+    vector_store : FAISS
+        O vector store FAISS (como retornado por `load_or_create_vector_store`).
+
+    query_vectors : list of list of float
+        Os vetores de consulta, um por pergunta.
+
+    k : int, opcional
+        Número de documentos retornados por consulta. O padrão é 4.
+
+    Retorno:
+    --------
+    list of list of (str, Document, float)
+        Para cada consulta, a lista de (id no docstore, documento, distância) em ordem de relevância.
+    """
+    import numpy as np
+
+    vectors = np.asarray(query_vectors, dtype=np.float32)
+    if getattr(vector_store, "_normalize_L2", False):
+        import faiss
+        faiss.normalize_L2(vectors)
+
+    distances, indices = vector_store.index.search(vectors, k)
+
+    results = []
+    for row_distances, row_indices in zip(distances, indices):
+        row = []
+        for distance, index in zip(row_distances, row_indices):
+            # O FAISS devolve -1 quando há menos de k vetores no índice
+            if index == -1:
+                continue
+            doc_id = vector_store.index_to_docstore_id[index]
+            row.append((doc_id, vector_store.docstore.search(doc_id), float(distance)))
+        results.append(row)
+    return results
+
+
+def answer_questions_batch(questions, vector_store, chain, k=4, embed_batch_size=64, max_concurrency=4):
+    """
+    Responde um lote de perguntas sobre um mesmo vector store, retornando os resultados em ordem à medida que ficam prontos.
+
+    As perguntas são vetorizadas em lote com a semântica de consulta (veja `embed_queries`), os documentos de todas elas são
+    buscados com uma única busca matricial no FAISS e a cadeia é executada com concorrência limitada. Perguntas
+    que recuperam exatamente o mesmo contexto formam um grupo, executado em sequência por um mesmo worker: os
+    prompts com o mesmo prefixo de contexto chegam ao provedor um após o outro, aproveitando o cache de prompt
+    (grupos diferentes rodam em paralelo). Erros são reportados por item, sem interromper o lote.
+
+    Parâmetros:
+    -----------
+    questions : list of str
+        As perguntas a serem respondidas.
+
+    vector_store : FAISS ou RemoteVectorStore
+        O vector store (como retornado por `load_or_create_vector_store`). Com um `RemoteVectorStore`, as
+        perguntas de cada lote são vetorizadas e buscadas pelo servidor em uma única requisição.
+
+    chain : BaseCombineDocumentsChain
+        A cadeia de perguntas e respostas (como retornada por `get_conversational_chain`).
+
+    k : int, opcional
+        Número de documentos recuperados por pergunta. O padrão é 4.
+
+    embed_batch_size : int, opcional
+        Quantidade de perguntas por chamada em lote ao modelo de embeddings. O padrão é 64.
+
+    max_concurrency : int, opcional
+        Número máximo de execuções simultâneas da cadeia. O padrão é 4.
+
+    Retorno:
+    --------
+    generator of dict
+        Um dicionário por pergunta, na mesma ordem de `questions`, com as chaves "question", "answer",
+        "source_documents" e "error" (None em caso de sucesso, ou a exceção ocorrida).
+
+    Exemplos:
+    ---------
+    >>> chain = get_conversational_chain(model, prompt_template, chain_type="stuff")
+    >>> for result in answer_questions_batch(perguntas, vector_store, chain, k=4, max_concurrency=8):
+    ...     print(result["question"], result["answer"] if result["error"] is None else result["error"])
+    """
+    import contextvars
+    from concurrent.futures import Future, ThreadPoolExecutor
+    from BIBLIOTECA_IA.models.embeddings import embed_queries
+
+    questions = list(questions)
+    embeddings = getattr(vector_store, "embeddings", None) or getattr(vector_store, "embedding_function", None)
+    documents = [None] * len(questions)
+    errors = [None] * len(questions)
+
+    # Vetoriza as perguntas em lotes e busca o contexto de cada lote com uma única busca no índice
+    for start in range(0, len(questions), embed_batch_size):
+        batch = questions[start:start + embed_batch_size]
+        try:
+            if embeddings is None and hasattr(vector_store, "batch_search"):
+                # Vector stores remotos vetorizam e buscam o lote no servidor
+                rows = vector_store.batch_search(batch, k)
+            else:
+                rows = batch_similarity_search(vector_store, embed_queries(embeddings, batch), k)
+            for offset, row in enumerate(rows):
+                documents[start + offset] = row
+        except Exception as e:
+            for offset in range(len(batch)):
+                errors[start + offset] = e
+
+    # Agrupa as perguntas que recuperaram exatamente o mesmo contexto
+    groups = {}
+    for index, row in enumerate(documents):
+        if row is not None:
+            groups.setdefault(tuple(doc_id for doc_id, _, _ in row), []).append(index)
+
+    def run_group(indices, docs):
+        for index in indices:
+            future = futures[index][0]
+            # Perguntas canceladas (o consumidor parou de iterar) não são enviadas
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = chain.invoke({"input_documents": docs, "question": questions[index]})
+                future.set_result(result["output_text"] if isinstance(result, dict) else result)
+            except Exception as e:
+                future.set_exception(e)
+
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for indices in groups.values():
+            shared_docs = [doc for _, doc, _ in documents[indices[0]]]
+            for index in indices:
+                futures[index] = (Future(), shared_docs)
+        for indices in groups.values():
+            # Cada grupo roda em uma cópia do contexto do chamador (ex: a prioridade de rate_limit.priority)
+            context = contextvars.copy_context()
+            executor.submit(context.run, run_group, indices, futures[indices[0]][1])
+
+        try:
+            for index, question in enumerate(questions):
+                answer, docs, error = None, [], errors[index]
+                if error is None:
+                    future, docs = futures[index]
+                    try:
+                        answer = future.result()
+                    except Exception as e:
+                        error = e
+                yield {"question": question, "answer": answer, "source_documents": docs, "error": error}
+        finally:
+            # Se o consumidor parar de iterar, descarta as perguntas que ainda não começaram
+            for future, _ in futures.values():
+                future.cancel()
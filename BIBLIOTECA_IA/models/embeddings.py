@@ -47,10 +47,14 @@ def get_embeddings(embeddings_name, model, api_key):
     """
     from langchain_openai import OpenAIEmbeddings
     from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from BIBLIOTECA_IA.models.rate_limit import get_http_client
 
     # Definir as instâncias de embedding
     google_embeddings = GoogleGenerativeAIEmbeddings(model=model, google_api_key=api_key)
-    openai_embeddings = OpenAIEmbeddings(model=model, openai_api_key=api_key)
+    # As chamadas da OpenAI passam pelo escalonador de rate limit compartilhado com os LLMs
+    openai_embeddings = OpenAIEmbeddings(model=model, openai_api_key=api_key,
+                                         http_client=get_http_client("openai", api_key),
+                                         http_async_client=get_http_client("openai", api_key, async_client=True))
 
     if embeddings_name == "Google":
         return google_embeddings
@@ -59,3 +63,48 @@ def get_embeddings(embeddings_name, model, api_key):
 
     # Levanta erro caso o nome do provedor de embeddings não seja válido
     raise ValueError(f"Provedor de embeddings '{embeddings_name}' não reconhecido. Escolha entre 'Google' ou 'Openai'.")
+
+
+def embed_queries(embeddings, texts):
+    """
+    Vetoriza uma lista de consultas (perguntas) com a semântica de `embed_query`, em lote quando possível.
+
+    Alguns provedores vetorizam consultas e documentos de forma diferente (a Google usa o task type
+    "RETRIEVAL_QUERY" em `embed_query` e "RETRIEVAL_DOCUMENT" em `embed_documents`), então vetorizar perguntas
+    com `embed_documents` piora a busca. Esta função usa uma chamada em lote apenas quando ela é equivalente a
+    `embed_query`:
+        - Se o objeto tiver um método `embed_queries(texts)`, ele é usado.
+        - OpenAI: `embed_query` é o próprio `embed_documents` de um único texto, então usa `embed_documents`.
+        - Google: usa `embed_documents(texts, task_type=...)` com o mesmo task type de `embed_query`.
+        - Nos demais casos, chama `embed_query` para cada texto.
+
+    Parâmetros:
+    -----------
+    embeddings : Embeddings ou callable
+        O modelo de embedding (ou a função de embedding de um vector store antigo).
+
+    texts : list of str
+        As consultas a serem vetorizadas.
+
+    Retorno:
+    --------
+    list of list of float
+        Um vetor por consulta, na mesma ordem de `texts`.
+    """
+    import inspect
+
+    texts = list(texts)
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if not hasattr(embeddings, "embed_query"):
+        return [embeddings(text) for text in texts]
+
+    class_names = {cls.__name__ for cls in type(embeddings).__mro__}
+    if "OpenAIEmbeddings" in class_names:
+        return embeddings.embed_documents(texts)
+    if "GoogleGenerativeAIEmbeddings" in class_names:
+        if "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+            task_type = getattr(embeddings, "task_type", None) or "RETRIEVAL_QUERY"
+            return embeddings.embed_documents(texts, task_type=task_type)
+
+    return [embeddings.embed_query(text) for text in texts]
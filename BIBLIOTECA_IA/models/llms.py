@@ -48,24 +48,40 @@ def get_llm(model_name, temperature, api_key):
     >>> model = get_llm("gemini-1.5-flash", 0.5, "your_google_api_key")
     >>> response = model("Como funciona a energia solar?")
     >>> print(response)
+
+    Observação:
+    -----------
+    As chamadas dos modelos da OpenAI e da Google passam pelo escalonador de rate limit do processo
+    (`BIBLIOTECA_IA.models.rate_limit`). Use `rate_limit.priority(rate_limit.BATCH)` em jobs de lote para
+    que não concorram com as chamadas interativas.
     """
     from langchain_community.chat_models import ChatOllama
     from langchain_openai import ChatOpenAI
     from langchain_google_genai import ChatGoogleGenerativeAI
     from langchain_community.llms import NLPCloud
+    from BIBLIOTECA_IA.models.rate_limit import get_http_client, get_rate_limiter
 
     if model_name == "gemini-1.5-flash":
-        return ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=temperature, google_api_key=api_key)
+        return ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=temperature, google_api_key=api_key,
+                                      rate_limiter=get_rate_limiter("google", api_key, "gemini-1.5-flash"))
     elif model_name == "gemini-1.5-pro":
-        return ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=temperature, google_api_key=api_key)
+        return ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=temperature, google_api_key=api_key,
+                                      rate_limiter=get_rate_limiter("google", api_key, "gemini-1.5-pro"))
     elif model_name == "gemini-pro":
-        return ChatGoogleGenerativeAI(model="gemini-pro", temperature=temperature, google_api_key=api_key)
+        return ChatGoogleGenerativeAI(model="gemini-pro", temperature=temperature, google_api_key=api_key,
+                                      rate_limiter=get_rate_limiter("google", api_key, "gemini-pro"))
     elif model_name == "gpt-3.5-turbo":
-        return ChatOpenAI(model="gpt-3.5-turbo", temperature=temperature, openai_api_key=api_key)
+        return ChatOpenAI(model="gpt-3.5-turbo", temperature=temperature, openai_api_key=api_key,
+                          http_client=get_http_client("openai", api_key),
+                          http_async_client=get_http_client("openai", api_key, async_client=True))
     elif model_name == "gpt-4o-mini":
-        return ChatOpenAI(model="gpt-4o-mini", temperature=temperature, openai_api_key=api_key)
+        return ChatOpenAI(model="gpt-4o-mini", temperature=temperature, openai_api_key=api_key,
+                          http_client=get_http_client("openai", api_key),
+                          http_async_client=get_http_client("openai", api_key, async_client=True))
     elif model_name == "gpt-4o":
-        return ChatOpenAI(model="gpt-4o", temperature=temperature, openai_api_key=api_key)
+        return ChatOpenAI(model="gpt-4o", temperature=temperature, openai_api_key=api_key,
+                          http_client=get_http_client("openai", api_key),
+                          http_async_client=get_http_client("openai", api_key, async_client=True))
     elif model_name == "llama3":
         return ChatOllama(model="llama3", temperature=temperature)
     elif model_name == "llama3.1:8b":
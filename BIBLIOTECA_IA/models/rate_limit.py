@@ -0,0 +1,424 @@
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# Classes de prioridade: valores menores são atendidos primeiro
+INTERACTIVE = 0
+BATCH = 1
+
+_current_priority = contextvars.ContextVar("biblioteca_ia_priority", default=INTERACTIVE)
+_current_tenant = contextvars.ContextVar("biblioteca_ia_tenant", default="default")
+
+
+@contextmanager
+def priority(level, tenant=None):
+    """
+    Define a classe de prioridade (e opcionalmente o "tenant") das chamadas feitas dentro do bloco.
+
+    Chamadas interativas (INTERACTIVE) sempre passam à frente das chamadas em lote (BATCH) que aguardam
+    o mesmo limite. Dentro de uma mesma classe, tenants diferentes são atendidos de forma justa.
+
+    Exemplos:
+    ---------
+    >>> with priority(BATCH, tenant="ingestao"):
+    ...     vector_store = load_or_create_vector_store(chunks, embeddings)
+    """
+    level_token = _current_priority.set(level)
+    tenant_token = _current_tenant.set(tenant) if tenant is not None else None
+    try:
+        yield
+    finally:
+        _current_priority.reset(level_token)
+        if tenant_token is not None:
+            _current_tenant.reset(tenant_token)
+
+
+def _parse_duration(value):
+    """
+    Converte durações dos headers de rate limit em segundos ("20ms", "1s", "6m0s", "1h2m3.5s" ou "2.5").
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+class TokenBucket:
+    """
+    Token bucket com capacidade `capacity` e reposição contínua de `capacity` unidades por `period` segundos.
+
+    Uma capacidade None significa sem limite conhecido: o bucket sempre libera. A capacidade pode ser
+    configurada manualmente ou aprendida a partir dos headers de rate limit do provedor.
+    """
+
+    def __init__(self, capacity=None, period=60.0):
+        self.capacity = capacity
+        self.period = period
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def set_capacity(self, capacity):
+        if capacity == self.capacity:
+            return
+        self._refill()
+        self.capacity = capacity
+        self.level = capacity if self.level is None else min(self.level, capacity)
+
+    def set_remaining(self, remaining):
+        if self.capacity is None:
+            return
+        self._refill()
+        self.level = min(self.level, remaining)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.capacity is not None:
+            rate = self.capacity / self.period
+            self.level = min(self.capacity, self.level + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """
+        Retorna quantos segundos faltam para haver `amount` unidades disponíveis (0 se já houver).
+        """
+        if self.capacity is None or amount <= 0:
+            return 0.0
+        self._refill()
+        # Pedidos maiores que a capacidade esperariam para sempre: limita ao tamanho do bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * self.period / self.capacity
+
+    def take(self, amount):
+        if self.capacity is None or amount <= 0:
+            return
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class _Limit:
+    """
+    Estado de limite de um provedor/chave/modelo: buckets de requisições e de tokens, fila de espera e backoff.
+    """
+
+    def __init__(self):
+        # Se True, o limite foi definido manualmente com configure() (relevante para o nível provedor/chave)
+        self.configured = False
+        self.requests = TokenBucket()
+        self.tokens = TokenBucket()
+        self.blocked_until = 0.0
+        self.consecutive_429 = 0
+        self.queue = []
+        self.virtual_time = 0.0
+        self.tenant_finish = {}
+
+
+class RateLimitScheduler:
+    """
+    Escalonador de chamadas às APIs dos provedores, compartilhado por todo o processo.
+
+    Mantém, para cada (provedor, chave de API, modelo), um token bucket de requisições por minuto e outro de
+    tokens por minuto: os provedores aplicam os limites por modelo, então o chat e a geração de embeddings de
+    uma mesma chave não se bloqueiam. Chamadas que não cabem nos limites aguardam em uma fila ordenada por
+    classe de prioridade (interativas antes de lote) e, dentro da classe, por fair queuing entre tenants. Os
+    limites são ajustados de forma adaptativa a partir dos headers de rate limit das respostas e, em respostas
+    429, as chamadas seguintes do mesmo modelo aguardam o `retry-after` informado ou um backoff exponencial.
+
+    Um limite configurado com `configure` sem `model` vale para todos os modelos do provedor/chave, além
+    dos limites de cada modelo.
+    """
+
+    def __init__(self, max_backoff=60.0):
+        self.max_backoff = max_backoff
+        self._limits = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _key(provider, api_key, model=None):
+        # A chave de API nunca é guardada em texto puro
+        digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        return provider, digest, model
+
+    def _limit(self, provider, api_key, model=None):
+        key = self._key(provider, api_key, model)
+        if key not in self._limits:
+            self._limits[key] = _Limit()
+        return self._limits[key]
+
+    def _limits_for(self, provider, api_key, model):
+        """
+        Limites aplicados a uma chamada: o do modelo e, se tiver sido configurado, o do provedor/chave.
+        """
+        limits = [self._limit(provider, api_key, model)]
+        if model is not None:
+            shared = self._limits.get(self._key(provider, api_key))
+            if shared is not None and shared.configured:
+                limits.append(shared)
+        return limits
+
+    def configure(self, provider, api_key=None, requests_per_minute=None, tokens_per_minute=None, model=None):
+        """
+        Define manualmente os limites de um provedor/chave, ou de um modelo específico se `model` for
+        informado. Valores None mantêm o limite atual.
+        """
+        with self._condition:
+            limit = self._limit(provider, api_key, model)
+            limit.configured = True
+            if requests_per_minute is not None:
+                limit.requests.set_capacity(requests_per_minute)
+            if tokens_per_minute is not None:
+                limit.tokens.set_capacity(tokens_per_minute)
+            self._condition.notify_all()
+
+    def acquire(self, provider, api_key=None, tokens=0, priority_level=None, tenant=None, model=None):
+        """
+        Bloqueia até que uma requisição com `tokens` tokens estimados possa ser enviada ao modelo do provedor.
+        """
+        priority_level = _current_priority.get() if priority_level is None else priority_level
+        tenant = _current_tenant.get() if tenant is None else tenant
+        cost = 1 + tokens
+
+        with self._condition:
+            limits = self._limits_for(provider, api_key, model)
+            limit = limits[0]
+            # Fair queuing: cada tenant avança seu próprio relógio virtual proporcionalmente ao custo
+            start = max(limit.virtual_time, limit.tenant_finish.get(tenant, 0.0))
+            finish = start + cost
+            limit.tenant_finish[tenant] = finish
+            # A mesma entrada vai para todas as filas, de modo que a menor entrada é a primeira de todas elas
+            entry = (priority_level, finish, next(self._counter))
+            for each in limits:
+                heapq.heappush(each.queue, entry)
+
+            try:
+                while True:
+                    if any(each.queue[0] is not entry for each in limits):
+                        self._condition.wait()
+                        continue
+                    wait = max(
+                        max(each.blocked_until - time.monotonic(), each.requests.wait_time(1),
+                            each.tokens.wait_time(tokens))
+                        for each in limits
+                    )
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                for each in limits:
+                    each.requests.take(1)
+                    each.tokens.take(tokens)
+                limit.virtual_time = max(limit.virtual_time, start)
+            finally:
+                for each in limits:
+                    each.queue.remove(entry)
+                    heapq.heapify(each.queue)
+                self._condition.notify_all()
+
+    def report(self, provider, api_key=None, status_code=None, headers=None, model=None):
+        """
+        Atualiza os limites do modelo a partir de uma resposta do provedor (headers x-ratelimit-* e retry-after).
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+        with self._condition:
+            limit = self._limit(provider, api_key, model)
+
+            for kind, bucket in (("requests", limit.requests), ("tokens", limit.tokens)):
+                capacity = headers.get(f"x-ratelimit-limit-{kind}")
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                try:
+                    if capacity is not None:
+                        bucket.set_capacity(float(capacity))
+                    if remaining is not None:
+                        bucket.set_remaining(float(remaining))
+                except ValueError:
+                    pass
+
+            if status_code == 429:
+                limit.consecutive_429 += 1
+                delay = _parse_duration(headers.get("retry-after-ms"))
+                delay = delay / 1000 if delay is not None else _parse_duration(headers.get("retry-after"))
+                if delay is None:
+                    delay = max(
+                        _parse_duration(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                        _parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0.0,
+                    )
+                if not delay:
+                    delay = min(self.max_backoff, 2 ** (limit.consecutive_429 - 1))
+                limit.blocked_until = max(limit.blocked_until, time.monotonic() + delay)
+            elif status_code is not None and status_code < 400:
+                limit.consecutive_429 = 0
+
+            self._condition.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+
+def get_scheduler():
+    """
+    Retorna o escalonador de rate limit compartilhado pelo processo.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler()
+        return _scheduler
+
+
+async def _acquire_async(provider, api_key, tokens=0, model=None):
+    """
+    Versão assíncrona de `acquire` para hooks e rate limiters async.
+
+    A espera usa uma thread própria por chamada, e não o executor padrão do event loop: esse executor é
+    compartilhado e limitado, e várias chamadas em lote aguardando o limite o esgotariam, travando outros
+    `run_in_executor` (e deixando chamadas interativas presas atrás delas, fora da fila de prioridade).
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    context = contextvars.copy_context()
+
+    def resolve(error):
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    def run():
+        try:
+            context.run(get_scheduler().acquire, provider, api_key, tokens, model=model)
+        except BaseException as e:
+            loop.call_soon_threadsafe(resolve, e)
+        else:
+            loop.call_soon_threadsafe(resolve, None)
+
+    threading.Thread(target=run, daemon=True, name="biblioteca_ia_rate_limit").start()
+    await future
+
+
+def _request_info(request):
+    """
+    Retorna o modelo de uma requisição (campo "model" do corpo JSON, ou None) e uma estimativa dos seus tokens
+    (~4 caracteres por token do corpo, mais o máximo de saída).
+    """
+    try:
+        body = request.content
+    except Exception:
+        return None, 0
+    if not body:
+        return None, 0
+    model, tokens = None, len(body) // 4
+    try:
+        payload = json.loads(body)
+        model = payload.get("model")
+        tokens += int(payload.get("max_tokens") or payload.get("max_completion_tokens") or 0)
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return (model if isinstance(model, str) else None), tokens
+
+
+def get_http_client(provider, api_key, async_client=False):
+    """
+    Retorna um cliente httpx cujas requisições passam pelo escalonador de rate limit do processo.
+
+    O cliente é compartilhado por todas as instâncias criadas com o mesmo provedor/chave, e pode ser
+    passado como `http_client` (ou `http_async_client`) para `ChatOpenAI`, `OpenAIEmbeddings` e `openai.OpenAI`.
+
+    Parâmetros:
+    -----------
+    provider : str
+        Nome do provedor (ex: "openai"). Os limites são mantidos separadamente por provedor, chave e modelo
+        (lido do campo "model" de cada requisição).
+
+    api_key : str
+        Chave de API usada nas chamadas.
+
+    async_client : bool, opcional
+        Se True, retorna um `httpx.AsyncClient` em vez de um `httpx.Client`.
+
+    Retorno:
+    --------
+    httpx.Client ou httpx.AsyncClient
+    """
+    import httpx
+
+    cache_key = (RateLimitScheduler._key(provider, api_key), async_client)
+    with _http_clients_lock:
+        if cache_key not in _http_clients:
+            _http_clients[cache_key] = _create_http_client(httpx, provider, api_key, async_client)
+        return _http_clients[cache_key]
+
+
+def _create_http_client(httpx, provider, api_key, async_client):
+    scheduler = get_scheduler()
+
+    def on_request(request):
+        model, tokens = _request_info(request)
+        scheduler.acquire(provider, api_key, tokens=tokens, model=model)
+
+    def on_response(response):
+        model, _ = _request_info(response.request)
+        scheduler.report(provider, api_key, response.status_code, response.headers, model=model)
+
+    if async_client:
+        async def on_request_async(request):
+            model, tokens = _request_info(request)
+            await _acquire_async(provider, api_key, tokens, model=model)
+
+        async def on_response_async(response):
+            on_response(response)
+
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            event_hooks={"request": [on_request_async], "response": [on_response_async]},
+        )
+    else:
+        client = httpx.Client(
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            event_hooks={"request": [on_request], "response": [on_response]},
+        )
+
+    return client
+
+
+def get_rate_limiter(provider, api_key, model=None):
+    """
+    Retorna um `BaseRateLimiter` do LangChain ligado ao escalonador, para modelos que não aceitam um
+    cliente httpx (ex: `ChatGoogleGenerativeAI`). Neste caso apenas o limite de requisições é aplicado,
+    separado por `model` quando informado.
+    """
+    from langchain_core.rate_limiters import BaseRateLimiter
+
+    class SchedulerRateLimiter(BaseRateLimiter):
+        def acquire(self, *, blocking=True):
+            get_scheduler().acquire(provider, api_key, model=model)
+            return True
+
+        async def aacquire(self, *, blocking=True):
+            await _acquire_async(provider, api_key, model=model)
+            return True
+
+    return SchedulerRateLimiter()
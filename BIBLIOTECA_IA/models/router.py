@@ -0,0 +1,378 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+
+class TargetStats:
+    """
+    Estatísticas móveis de um alvo do roteador (latência e taxa de erro).
+
+    Mantém as últimas `window` medições de latência (apenas chamadas bem-sucedidas) e o resultado das
+    últimas `window` chamadas, permitindo calcular p50/p95 e a taxa de erro recente. Medições com mais de
+    `max_age` segundos são descartadas, para que uma falha passageira não rebaixe o alvo para sempre.
+    """
+
+    def __init__(self, window=50, max_age=300.0):
+        self.max_age = max_age
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        limit = time.monotonic() - self.max_age
+        for entries in (self.latencies, self.outcomes):
+            while entries and entries[0][0] < limit:
+                entries.popleft()
+
+    def record_success(self, latency):
+        with self._lock:
+            now = time.monotonic()
+            self.latencies.append((now, latency))
+            self.outcomes.append((now, True))
+
+    def record_failure(self):
+        with self._lock:
+            self.outcomes.append((time.monotonic(), False))
+
+    def percentile(self, q):
+        with self._lock:
+            self._expire()
+            values = sorted(latency for _, latency in self.latencies)
+        if not values:
+            return None
+        index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+        return values[index]
+
+    @property
+    def p50(self):
+        return self.percentile(0.50)
+
+    @property
+    def p95(self):
+        return self.percentile(0.95)
+
+    @property
+    def error_rate(self):
+        with self._lock:
+            self._expire()
+            if not self.outcomes:
+                return 0.0
+            return sum(1 for _, ok in self.outcomes if not ok) / len(self.outcomes)
+
+    @property
+    def last_failed(self):
+        with self._lock:
+            return bool(self.outcomes) and not self.outcomes[-1][1]
+
+    @property
+    def last_attempt(self):
+        with self._lock:
+            return self.outcomes[-1][0] if self.outcomes else None
+
+    @property
+    def samples(self):
+        with self._lock:
+            self._expire()
+            return len(self.outcomes)
+
+    def snapshot(self):
+        return {"p50": self.p50, "p95": self.p95, "error_rate": self.error_rate, "samples": self.samples}
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker simples com os estados "closed", "open" e "half_open".
+
+    Após `failure_threshold` falhas consecutivas o circuito abre e o alvo deixa de receber requisições
+    por `recovery_timeout` segundos. Passado esse tempo, uma única requisição de teste é liberada
+    (half_open): se tiver sucesso o circuito fecha, se falhar volta a abrir.
+    """
+
+    def __init__(self, failure_threshold=3, recovery_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if time.monotonic() - self._opened_at >= self.recovery_timeout:
+                # Libera uma única requisição de teste; se ela não concluir, outra é liberada após novo timeout
+                self.state = "half_open"
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RouterChatModel(BaseChatModel):
+    """
+    Chat model que distribui as requisições entre vários modelos (alvos) de acordo com a latência e a saúde de cada um.
+
+    Cada requisição é enviada ao alvo saudável com menor p50 de latência. Se a resposta não chegar em
+    `hedge_delay` segundos, a mesma requisição é enviada ao segundo melhor alvo (hedging) e a primeira
+    resposta válida é usada. Alvos que falham repetidamente têm o circuito aberto e só voltam a ser
+    usados após `recovery_timeout`. Se todos os alvos principais falharem, os modelos de `fallbacks`
+    (normalmente modelos locais do Ollama) são tentados em ordem.
+
+    Um alvo só é considerado não saudável com pelo menos `min_samples` medições recentes, taxa de erro
+    acima de `max_error_rate` e a última chamada com falha; as medições expiram após `stats_max_age`
+    segundos. A cada `probe_interval` segundos um alvo não saudável volta a receber uma requisição de
+    teste, e basta um sucesso para ele voltar a ser considerado.
+
+    Os alvos podem ser quaisquer `BaseChatModel`, o que permite testar o roteador contra servidores
+    locais de teste (por exemplo `ChatOpenAI(base_url="http://localhost:8001/v1")` apontando para um
+    stub com latência injetada; veja `BIBLIOTECA_IA/examples/router_stub_servers.py`).
+    """
+
+    targets: List[BaseChatModel]
+    fallbacks: List[BaseChatModel] = []
+    hedge_delay: Optional[float] = 2.0
+    stats_window: int = 50
+    stats_max_age: float = 300.0
+    min_samples: int = 5
+    probe_interval: float = 10.0
+    failure_threshold: int = 3
+    recovery_timeout: float = 30.0
+    max_error_rate: float = 0.5
+
+    _stats: list = PrivateAttr(default_factory=list)
+    _breakers: list = PrivateAttr(default_factory=list)
+
+    def __init__(self, **data):
+        super().__init__(**data)
+        total = len(self.targets) + len(self.fallbacks)
+        self._stats = [TargetStats(self.stats_window, self.stats_max_age) for _ in range(total)]
+        self._breakers = [CircuitBreaker(self.failure_threshold, self.recovery_timeout) for _ in range(total)]
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    def _target(self, index):
+        if index < len(self.targets):
+            return self.targets[index]
+        return self.fallbacks[index - len(self.targets)]
+
+    def _ranked_targets(self):
+        """
+        Ordena os alvos principais: saudáveis primeiro, depois pelo p50 de latência.
+        Alvos ainda sem medições vêm antes dos medidos para que recebam tráfego e sejam avaliados.
+        """
+        now = time.monotonic()
+
+        def key(index):
+            stats = self._stats[index]
+            last_attempt = stats.last_attempt
+            probe_due = last_attempt is not None and now - last_attempt >= self.probe_interval
+            unhealthy = (stats.samples >= self.min_samples and stats.error_rate > self.max_error_rate
+                         and stats.last_failed and not probe_due)
+            p50 = stats.p50
+            return (unhealthy, p50 is not None, p50 or 0.0)
+
+        return sorted(range(len(self.targets)), key=key)
+
+    def _call_target(self, index, messages, stop, kwargs):
+        start = time.monotonic()
+        try:
+            result = self._target(index).invoke(messages, stop=stop, **kwargs)
+        except Exception:
+            self._stats[index].record_failure()
+            self._breakers[index].record_failure()
+            raise
+        self._stats[index].record_success(time.monotonic() - start)
+        self._breakers[index].record_success()
+        return result
+
+    def _start_call(self, index, messages, stop, kwargs):
+        """
+        Inicia a chamada ao alvo em uma thread própria e retorna um Future com o resultado.
+
+        Não há pool compartilhado: cada chamada começa imediatamente, então a concorrência do processo não
+        fica limitada pelo roteador e o tempo de hedge conta a partir do início real da chamada.
+        """
+        future = Future()
+        # Propaga o contexto do chamador (ex: a prioridade de rate_limit.priority) para a thread da chamada
+        context = contextvars.copy_context()
+
+        def run():
+            try:
+                future.set_result(self._call_target(index, messages, stop, kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=context.run, args=(run,), daemon=True).start()
+        return future
+
+    def _run_with_hedging(self, candidates, messages, stop, kwargs):
+        """
+        Executa a requisição no primeiro candidato e, após `hedge_delay`, no próximo.
+        Retorna a primeira resposta bem-sucedida ou levanta o último erro.
+        """
+        pending = {}
+        last_error = None
+        queue = list(candidates)
+
+        def launch():
+            # O circuito só é consultado quando o alvo realmente vai receber a requisição
+            while queue:
+                index = queue.pop(0)
+                if self._breakers[index].allow_request():
+                    pending[self._start_call(index, messages, stop, kwargs)] = index
+                    return
+
+        launch()
+        if not pending:
+            raise RuntimeError("Nenhum modelo disponível: todos os alvos estão com o circuito aberto.")
+        while pending:
+            timeout = self.hedge_delay if queue and len(pending) < 2 else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # O alvo principal está lento: dispara a requisição de hedge
+                launch()
+                continue
+            for future in done:
+                pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+            # Houve falha: tenta o próximo alvo imediatamente, se ainda não houver outro em andamento
+            if queue and not pending:
+                launch()
+        raise last_error
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        last_error = None
+
+        if self.targets:
+            try:
+                message = self._run_with_hedging(self._ranked_targets(), messages, stop, kwargs)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                last_error = e
+
+        # Todos os alvos principais falharam ou estão com o circuito aberto: usa os fallbacks locais
+        for index in range(len(self.targets), len(self.targets) + len(self.fallbacks)):
+            if not self._breakers[index].allow_request():
+                continue
+            try:
+                message = self._call_target(index, messages, stop, kwargs)
+                return ChatResult(generations=[ChatGeneration(message=message)])
+            except Exception as e:
+                last_error = e
+
+        if last_error is None:
+            raise RuntimeError("Nenhum modelo disponível: todos os alvos estão com o circuito aberto.")
+        raise last_error
+
+    def get_stats(self):
+        """
+        Retorna as estatísticas atuais de cada alvo (p50, p95, taxa de erro e estado do circuito).
+        """
+        stats = []
+        for index in range(len(self.targets) + len(self.fallbacks)):
+            target = self._target(index)
+            entry = self._stats[index].snapshot()
+            entry["target"] = getattr(target, "model_name", None) or getattr(target, "model", None) or type(target).__name__
+            entry["fallback"] = index >= len(self.targets)
+            entry["circuit"] = self._breakers[index].state
+            stats.append(entry)
+        return stats
+
+
+def get_llm_router(model_names, temperature, api_keys, fallback_models=("llama3.1:8b",), hedge_delay=2.0,
+                   failure_threshold=3, recovery_timeout=30.0):
+    """
+    Função que retorna um modelo roteador sobre vários modelos obtidos com `get_llm`.
+
+    O roteador acompanha a latência (p50/p95) e a taxa de erro de cada modelo, envia cada requisição ao
+    modelo saudável mais rápido, faz hedging com um segundo modelo após `hedge_delay` segundos e recorre
+    aos modelos locais do Ollama quando todos os demais falham.
+
+    Parâmetros:
+    -----------
+    model_names : list of str
+        Nomes dos modelos principais, nos mesmos formatos aceitos por `get_llm` (ex: "gpt-4o", "gemini-1.5-flash").
+
+    temperature : float
+        Temperatura usada em todos os modelos.
+
+    api_keys : str ou dict
+        Chave de API usada por todos os modelos, ou um dicionário {nome_do_modelo: chave}.
+
+    fallback_models : list of str, opcional
+        Modelos locais usados quando todos os principais falham. O padrão é ("llama3.1:8b",).
+
+    hedge_delay : float ou None, opcional
+        Segundos de espera antes de enviar a requisição de hedge ao segundo modelo. None desativa o hedging.
+
+    failure_threshold : int, opcional
+        Número de falhas consecutivas que abre o circuito de um modelo.
+
+    recovery_timeout : float, opcional
+        Segundos que um circuito aberto aguarda antes de liberar uma requisição de teste.
+
+    Retorno:
+    --------
+    RouterChatModel
+        Um chat model que pode ser usado no lugar do modelo retornado por `get_llm`.
+
+    Exceções:
+    ----------
+    ValueError:
+        Se algum dos nomes de modelo não for reconhecido por `get_llm`.
+
+    Exemplos:
+    ---------
+    >>> model = get_llm_router(["gpt-4o", "gemini-1.5-flash"], 0.7,
+    ...                        {"gpt-4o": "your_openai_api_key", "gemini-1.5-flash": "your_google_api_key"})
+    >>> response = model.invoke("Qual é a capital da França?")
+    >>> print(model.get_stats())
+    """
+    from BIBLIOTECA_IA.models.llms import get_llm
+
+    def key_for(model_name):
+        if isinstance(api_keys, dict):
+            return api_keys.get(model_name)
+        return api_keys
+
+    targets = [get_llm(name, temperature, key_for(name)) for name in model_names]
+    fallbacks = [get_llm(name, temperature, key_for(name)) for name in (fallback_models or [])]
+
+    return RouterChatModel(
+        targets=targets,
+        fallbacks=fallbacks,
+        hedge_delay=hedge_delay,
+        failure_threshold=failure_threshold,
+        recovery_timeout=recovery_timeout,
+    )
@@ -31,6 +31,10 @@ setup(
         "streamlit",
         "flask",
     ],
+    extras_require={
+        # Backends opcionais de extração de PDF (veja tools_utils/pdf_utils.py)
+        "pdf": ["pypdfium2", "pdfminer.six"],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",